@@ -5,7 +5,7 @@ AGI Android MCP Demo — Let Claude drive your phone via ADB.
 An agentic loop: screenshot -> Claude decides action -> execute via ADB -> repeat.
 
 Usage:
-    pip install anthropic
+    pip install anthropic pillow  # pillow is optional, used to downscale screenshots
     ANTHROPIC_API_KEY=sk-... python demo.py "Open Chrome and search for cats"
 
 Prerequisites:
@@ -16,18 +16,46 @@ Prerequisites:
 
 import argparse
 import base64
+import hashlib
+import io
 import os
+import re
+import select
+import shlex
 import shutil
+import struct
 import subprocess
 import sys
+import threading
 import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import anthropic
+    import httpx
 except ImportError:
     print("Error: 'anthropic' package required. Install with: pip install anthropic")
     sys.exit(1)
 
+try:
+    import h2  # noqa: F401 — enables HTTP/2 in httpx
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import grpc  # optional: pip install grpcio — faster emulator screenshots
+except ImportError:
+    grpc = None
+
 # ---------------------------------------------------------------------------
 # Colors for terminal output
 # ---------------------------------------------------------------------------
@@ -60,20 +88,135 @@ BANNER = f"""{C.CYAN}{C.BOLD}
 # ---------------------------------------------------------------------------
 
 ADB = os.environ.get("ADB_PATH", shutil.which("adb") or "adb")
+if shutil.which(ADB):
+    # Resolve to an absolute path once; subprocess only uses posix_spawn for those.
+    ADB = os.path.abspath(shutil.which(ADB))
 SERIAL = os.environ.get("ADB_SERIAL", "")
 
+# Children only get the variables adb cares about instead of a full copy of
+# our environment (POSIX only — Windows processes need much more).
+_ADB_ENV = (
+    {
+        k: v
+        for k, v in os.environ.items()
+        if k in ("PATH", "HOME", "TMPDIR") or k.startswith(("ADB_", "ANDROID_"))
+    }
+    if os.name == "posix"
+    else None
+)
+
 
 def _adb(*args: str, timeout: float = 10.0) -> subprocess.CompletedProcess:
     cmd = [ADB]
     if SERIAL:
         cmd += ["-s", SERIAL]
     cmd += list(args)
-    return subprocess.run(cmd, capture_output=True, timeout=timeout)
+    # close_fds=False is safe (Python fds are non-inheritable by default) and,
+    # with an absolute ADB path, lets subprocess use posix_spawn over fork+exec.
+    return subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=-1,
+        close_fds=False,
+        env=_ADB_ENV,
+        timeout=timeout,
+    )
+
+
+class _AdbShell:
+    """One long-lived `adb shell`; commands go in on stdin, output is read to a sentinel."""
+
+    def __init__(self):
+        self.p = None
+        self.lock = threading.Lock()
+        self.token = uuid.uuid4().hex
+        self.begin = f"__BEGIN_{self.token}__".encode()
+        self.sentinel = f"__END_{self.token}__".encode()
+
+    def _start(self):
+        cmd = [ADB] + (["-s", SERIAL] if SERIAL else []) + ["shell"]
+        self.p = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=-1,
+            close_fds=False,
+            env=_ADB_ENV,
+        )
+
+    def close(self):
+        if self.p is not None:
+            self.p.kill()
+            self.p.wait()
+            self.p = None
+
+    def _send(self, line: bytes):
+        if self.p is None or self.p.poll() is not None:
+            self.close()
+            self._start()
+        try:
+            self.p.stdin.write(line)
+            self.p.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.close()
+            self._start()
+            try:
+                self.p.stdin.write(line)
+                self.p.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.close()
+                raise RuntimeError(f"adb shell is not accepting commands: {e}") from e
+
+    def run(self, command: str, timeout: float = 10.0) -> tuple[int, bytes]:
+        if os.name != "posix":
+            # select() can't wait on pipes on Windows; use one-shot adb there.
+            r = _adb("shell", command, timeout=timeout)
+            return r.returncode, r.stdout
+        # The markers are printed as two halves, so a PTY echoing this line back
+        # (devices without shell_v2) can never be mistaken for them.
+        line = (
+            f"printf '%s%s\\n' __BEGIN_ {self.token}__; "
+            f"sh -c {shlex.quote(command)} </dev/null; "
+            f"printf '\\n%s%s%d\\n' __END_ {self.token}__ $?\n"
+        ).encode()
+        with self.lock:
+            self._send(line)
+            fd = self.p.stdout.fileno()
+            buf = bytearray()
+            deadline = time.monotonic() + timeout
+            while True:
+                end = buf.find(self.sentinel)
+                if end != -1 and buf.find(b"\n", end) != -1:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    self.close()
+                    raise RuntimeError(f"adb shell exited while running: {command}")
+                buf += chunk
+            status_end = buf.index(b"\n", end)
+            try:
+                code = int(buf[end + len(self.sentinel):status_end].rstrip(b"\r"))
+            except ValueError:
+                self.close()
+                raise RuntimeError(f"adb shell returned no exit status for: {command}")
+            start = buf.find(self.begin)
+            start = buf.index(b"\n", start) + 1 if start != -1 else 0
+            out = bytes(buf[start:end]).removesuffix(b"\n").removesuffix(b"\r")
+            return code, out
+
+
+_adb_shell = _AdbShell()
 
 
 def _shell(*args: str, timeout: float = 10.0) -> str:
-    r = _adb("shell", *args, timeout=timeout)
-    return r.stdout.decode("utf-8", errors="replace").strip()
+    _, out = _adb_shell.run(" ".join(args), timeout=timeout)
+    return out.decode("utf-8", errors="replace").strip()
 
 
 # ---------------------------------------------------------------------------
@@ -81,6 +224,25 @@ def _shell(*args: str, timeout: float = 10.0) -> str:
 # ---------------------------------------------------------------------------
 
 SCREEN_W, SCREEN_H = 0, 0
+_SIZE_RE = re.compile(r"Physical size:\s*(\d+)x(\d+)")
+
+# The API downsizes images past 1568px on the long edge or ~1.15 MP anyway, so
+# shrink them locally first. SCALE is fixed from the first captured frame (which
+# reflects any `wm size` override) and then applied to every frame whatever its
+# orientation; Claude works in screenshot pixels, and tap/long_press
+# coordinates are scaled back up to device pixels.
+MAX_LONG_EDGE = 1568
+MAX_PIXELS = 1_150_000
+SCALE = 1.0
+_scale_fixed = False
+
+
+def _frame_scale(width: int, height: int) -> float:
+    global SCALE, _scale_fixed
+    if not _scale_fixed and Image is not None:
+        SCALE = min(1.0, MAX_LONG_EDGE / max(width, height), (MAX_PIXELS / (width * height)) ** 0.5)
+        _scale_fixed = True
+    return SCALE
 
 TOOLS = [
     {
@@ -172,6 +334,8 @@ TOOLS = [
             },
             "required": ["summary"],
         },
+        # Cache breakpoint: the tool list is identical on every turn.
+        "cache_control": {"type": "ephemeral"},
     },
 ]
 
@@ -215,51 +379,370 @@ def log_action(name: str, args: dict):
 
 
 def log_result(name: str, elapsed_ms: int):
-    print(f"  {C.GREEN}done{C.RESET} {C.DIM}({elapsed_ms}ms){C.RESET}")
+    extra = ""
+    if name == "screenshot":
+        extra = f" | frame cache {_shot_stats['hits']}/{_shot_stats['total']} hits"
+    print(f"  {C.GREEN}done{C.RESET} {C.DIM}({elapsed_ms}ms{extra}){C.RESET}")
 
 
 # ---------------------------------------------------------------------------
 # Tool execution via ADB
 # ---------------------------------------------------------------------------
 
+# Recent frames keyed by content hash -> (image source, width, height), so a repeated frame
+# skips encoding/uploading and one identical to the previous frame isn't re-sent.
+SHOT_CACHE_SIZE = 8
+_shot_cache: OrderedDict[bytes, tuple[dict, int, int]] = OrderedDict()
+_shot_stats = {"hits": 0, "total": 0, "last": None}
 
-def exec_tool(name: str, args: dict) -> list:
-    """Execute a tool call via ADB and return Anthropic content blocks."""
 
-    if name == "screenshot":
+# `screencap` without -p dumps the raw framebuffer (width, height, format
+# header + pixels); encoding the PNG here at a fast zlib level beats making the
+# phone do it. Maps pixel format -> (PIL mode, bytes per pixel, PNG color type).
+_RAW_FORMATS = {1: ("RGBA", 4, 6), 3: ("RGB", 3, 2)}
+PNG_COMPRESS_LEVEL = 1
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def _encode_png(width: int, height: int, pixels, bpp: int, color_type: int) -> bytes:
+    stride = width * bpp
+    view = memoryview(pixels)
+    raw = b"\x00" + b"\x00".join(view[i:i + stride] for i in range(0, height * stride, stride))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(raw, PNG_COMPRESS_LEVEL))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def _parse_raw(buf: bytes):
+    """Split raw `screencap` output into (width, height, format, pixels), or None."""
+    if len(buf) < 12:
+        return None
+    width, height, fmt = struct.unpack_from("<III", buf)
+    if fmt not in _RAW_FORMATS:
+        return None
+    header = len(buf) - width * height * _RAW_FORMATS[fmt][1]
+    if header not in (12, 16):  # Android 9+ appends a dataspace word
+        return None
+    return width, height, fmt, memoryview(buf)[header:]
+
+
+# Emulators serve raw RGB888 frames over gRPC (-grpc <console port + 3000>). The
+# Image message is decoded by hand and repackaged as raw screencap output, so the
+# rest of the pipeline doesn't care where a frame came from.
+GRPC_PORT = os.environ.get("ANDROID_GRPC_PORT", "")
+_GET_SCREENSHOT = "/android.emulation.control.EmulatorController/getScreenshot"
+_RGB888_REQUEST = b"\x08\x02"  # ImageFormat{format: RGB888}
+_grpc_state: dict = {}  # port -> getScreenshot callable, or None once it failed
+_device_serial = SERIAL  # filled in from `adb devices` when ADB_SERIAL is unset
+
+
+def _proto_fields(msg: bytes):
+    """Yield (field, value) for varint and length-delimited protobuf fields."""
+    def varint(pos):
+        value = shift = 0
+        while True:
+            b = msg[pos]
+            pos += 1
+            value |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return value, pos
+            shift += 7
+
+    pos = 0
+    while pos < len(msg):
+        key, pos = varint(pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = varint(pos)
+            yield field, value
+        elif wire == 2:
+            size, pos = varint(pos)
+            yield field, msg[pos:pos + size]
+            pos += size
+        elif wire in (1, 5):
+            pos += 8 if wire == 1 else 4
+        else:
+            raise ValueError(f"unsupported protobuf wire type {wire}")
+
+
+def _grpc_frame(msg: bytes) -> bytes:
+    """Turn an emulator Image message into raw `screencap` bytes, or b"" if unusable."""
+    width = height = 0
+    pixels = b""
+    for field, value in _proto_fields(msg):
+        if field == 1 and isinstance(value, bytes):  # ImageFormat
+            for f, v in _proto_fields(value):
+                if f == 3:
+                    width = v
+                elif f == 4:
+                    height = v
+        elif field == 4:
+            pixels = value
+    if not width or len(pixels) != width * height * 3:
+        return b""
+    return struct.pack("<III", width, height, 3) + pixels
+
+
+def _grpc_port() -> int | None:
+    if not _device_serial.startswith("emulator-"):
+        return None
+    if GRPC_PORT:
+        return int(GRPC_PORT)
+    try:
+        return 8554 + (int(_device_serial.split("-")[1]) - 5554)
+    except (IndexError, ValueError):
+        return None
+
+
+def _grpc_grab() -> bytes | None:
+    """Raw frame from the emulator's gRPC endpoint; None means use adb instead."""
+    if grpc is None:
+        return None
+    port = _grpc_port()
+    if port is None:
+        return None
+    if port not in _grpc_state:
+        channel = grpc.insecure_channel(
+            f"localhost:{port}",
+            options=[("grpc.max_receive_message_length", 32 * 1024 * 1024)],
+        )
+        try:
+            grpc.channel_ready_future(channel).result(timeout=1.0)
+        except grpc.FutureTimeoutError:
+            channel.close()
+            _grpc_state[port] = None
+            return None
+        _grpc_state[port] = channel.unary_unary(
+            _GET_SCREENSHOT, request_serializer=None, response_deserializer=_grpc_frame
+        )
+    stub = _grpc_state[port]
+    if stub is None:
+        return None
+    try:
+        return stub(_RGB888_REQUEST, timeout=5.0) or None
+    except grpc.RpcError as e:
+        if e.code() in (grpc.StatusCode.UNAUTHENTICATED, grpc.StatusCode.UNIMPLEMENTED):
+            _grpc_state[port] = None
+        return None
+
+
+def _grab_screen() -> bytes:
+    buf = _grpc_grab()
+    if buf:
+        return buf
+    r = _adb("exec-out", "screencap", timeout=15.0)
+    if r.returncode != 0 or not r.stdout:
+        raise RuntimeError(r.stderr.decode("utf-8", errors="replace"))
+    return r.stdout
+
+
+def _screen_png(buf: bytes) -> tuple[bytes, int, int]:
+    """Turn a raw frame into the (downscaled) PNG sent to Claude, plus its size.
+
+    The target size comes from the frame itself, so landscape frames keep
+    their aspect ratio.
+    """
+    frame = _parse_raw(buf)
+    if frame is None:
+        # Unsupported pixel format: let the device encode the PNG.
         r = _adb("exec-out", "screencap", "-p", timeout=15.0)
-        if r.returncode != 0 or not r.stdout:
-            return [{"type": "text", "text": f"Screenshot failed: {r.stderr.decode()}"}]
-        b64 = base64.standard_b64encode(r.stdout).decode("ascii")
-        return [
-            {"type": "text", "text": f"Here is the current screen ({SCREEN_W}x{SCREEN_H}):"},
-            {
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": "image/png",
-                    "data": b64,
-                },
-            },
-        ]
+        if r.returncode != 0 or len(r.stdout) < 24:
+            raise RuntimeError(
+                r.stderr.decode("utf-8", errors="replace") or "screencap returned empty data"
+            )
+        png = r.stdout
+        width, height = struct.unpack(">II", png[16:24])  # IHDR
+        scale = _frame_scale(width, height)
+        if Image is None or scale >= 1.0:
+            return png, width, height
+        img = Image.open(io.BytesIO(png))
+    else:
+        width, height, fmt, pixels = frame
+        mode, bpp, color_type = _RAW_FORMATS[fmt]
+        scale = _frame_scale(width, height)
+        if Image is None:
+            return _encode_png(width, height, pixels, bpp, color_type), width, height
+        img = Image.frombuffer(mode, (width, height), pixels, "raw", mode, 0, 1)
+    if scale < 1.0:
+        size = (round(img.width * scale), round(img.height * scale))
+        img = img.resize(size, Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return out.getvalue(), img.width, img.height
+
+
+# With --files-api, screenshots are uploaded once and referenced by file_id, so
+# the growing message history doesn't re-send every image inline on each turn.
+FILES_API_BETA = "files-api-2025-04-14"
+FILES_API_MIN_BYTES = 32 * 1024  # smaller PNGs are cheaper to inline
+_uploads = {"client": None, "ids": []}
+
+
+def _image_source(png: bytes) -> dict:
+    client = _uploads["client"]
+    if client is not None and len(png) >= FILES_API_MIN_BYTES:
+        try:
+            uploaded = client.beta.files.upload(file=("screen.png", png, "image/png"))
+        except anthropic.APIError:
+            pass  # the screenshot still works inline; only the upload failed
+        else:
+            _uploads["ids"].append(uploaded.id)
+            return {"type": "file", "file_id": uploaded.id}
+    return {
+        "type": "base64",
+        "media_type": "image/png",
+        "data": base64.b64encode(png).decode("ascii"),
+    }
+
+
+def _delete_uploads():
+    """Remove screenshots uploaded during the run from the Files API."""
+    client = _uploads["client"]
+    while _uploads["ids"]:
+        try:
+            client.beta.files.delete(_uploads["ids"].pop())
+        except anthropic.APIError:
+            pass
+
+
+def _screenshot_blocks(buf: bytes) -> list:
+    """Build the content blocks for a captured frame, reusing cached encodings."""
+    h = hashlib.sha256(buf).digest()
+    _shot_stats["total"] += 1
+    if h in _shot_cache:
+        _shot_stats["hits"] += 1
+        _shot_cache.move_to_end(h)
+        source, width, height = _shot_cache[h]
+        if h == _shot_stats["last"]:
+            return [{"type": "text", "text": "Screen unchanged since the last screenshot."}]
+    else:
+        try:
+            png, width, height = _screen_png(buf)
+        except (RuntimeError, OSError) as e:  # OSError: Pillow can't decode the PNG
+            return [{"type": "text", "text": f"Screenshot failed: {e}"}]
+        source = _image_source(png)
+        _shot_cache[h] = (source, width, height)
+        if len(_shot_cache) > SHOT_CACHE_SIZE:
+            _shot_cache.popitem(last=False)
+    _shot_stats["last"] = h
+    return [
+        {"type": "text", "text": f"Here is the current screen ({width}x{height}):"},
+        {"type": "image", "source": source},
+    ]
+
+
+# `input text` goes through the device shell: spaces become %s and shell
+# metacharacters are backslash-escaped, in a single translate() pass.
+_TYPE_TRANS = str.maketrans({
+    "\\": "\\\\",
+    " ": "%s",
+    "'": "\\'",
+    '"': '\\"',
+    "&": "\\&",
+    "|": "\\|",
+    ";": "\\;",
+    "(": "\\(",
+    ")": "\\)",
+    "<": "\\<",
+    ">": "\\>",
+    "`": "\\`",
+})
+
+
+def _to_device(x: float, y: float) -> tuple[int, int]:
+    """Map screenshot coordinates from Claude back to device pixels."""
+    return round(float(x) / SCALE), round(float(y) / SCALE)
+
+
+# While the API call is in flight the phone is idle, so as soon as the streamed
+# response starts a screenshot call the frame is captured in the background.
+# It is only used if that screenshot is the next tool to run and still recent.
+PREFETCH_MAX_AGE = 3.0
+_executor = ThreadPoolExecutor(max_workers=1)
+_prefetch = {"future": None, "started": 0.0}
+
+
+def _start_prefetch():
+    _prefetch["future"] = _executor.submit(_grab_screen)
+    _prefetch["started"] = time.monotonic()
+
+
+def _take_prefetch() -> bytes | None:
+    future, _prefetch["future"] = _prefetch["future"], None
+    if future is None or time.monotonic() - _prefetch["started"] > PREFETCH_MAX_AGE:
+        return None
+    try:
+        return future.result()
+    except (RuntimeError, subprocess.SubprocessError, OSError):
+        # A failed speculation just means capturing fresh.
+        return None
+
+
+# Tools that change the screen; a screenshot is attached after the last one in a turn.
+MUTATING_TOOLS = {"tap", "type_text", "swipe", "press_key", "launch_app", "long_press"}
+# Give transitions a moment to finish before the automatic screenshot.
+SETTLE_SECONDS = 0.5
+
+
+def _act(*args: str, verify: bool = False) -> list:
+    """Run an input command; with `verify`, also capture the screen.
+
+    The verification screenshot runs in the same `adb exec-out` call as the
+    action (`cmd; sleep; screencap`), saving a second adb round-trip.
+    """
+    if not verify:
+        _shell(*args)
+        return []
+    cmd = " ".join(args)
+    r = _adb(
+        "exec-out",
+        f"{cmd} >/dev/null 2>&1; sleep {SETTLE_SECONDS}; screencap",
+        timeout=20.0,
+    )
+    if r.returncode != 0 or not r.stdout:
+        return [{"type": "text", "text": f"Screenshot failed: {r.stderr.decode()}"}]
+    return _screenshot_blocks(r.stdout)
+
+
+def exec_tool(name: str, args: dict, verify: bool = False) -> list:
+    """Execute a tool call via ADB and return Anthropic content blocks.
+
+    With `verify`, screen-changing tools also return a screenshot taken
+    right after the action.
+    """
+
+    if name != "screenshot":
+        # Any other action makes a speculative frame stale.
+        _prefetch["future"] = None
+
+    if name == "screenshot":
+        buf = _take_prefetch()
+        if buf is None:
+            try:
+                buf = _grab_screen()
+            except RuntimeError as e:
+                return [{"type": "text", "text": f"Screenshot failed: {e}"}]
+        return _screenshot_blocks(buf)
 
     elif name == "tap":
-        x, y = int(args["x"]), int(args["y"])
-        _shell("input", "tap", str(x), str(y))
-        return [{"type": "text", "text": f"Tapped ({x}, {y})"}]
+        # Echo Claude's screenshot coordinates; only adb sees device pixels.
+        x, y = _to_device(args["x"], args["y"])
+        return [{"type": "text", "text": f"Tapped ({args['x']}, {args['y']})"}] + _act(
+            "input", "tap", str(x), str(y), verify=verify
+        )
 
     elif name == "type_text":
         text = args["text"]
-        escaped = text.replace(" ", "%s")
-        escaped = escaped.replace("'", "\\'")
-        escaped = escaped.replace('"', '\\"')
-        escaped = escaped.replace("&", "\\&")
-        escaped = escaped.replace("|", "\\|")
-        escaped = escaped.replace(";", "\;")
-        escaped = escaped.replace("(", "\\(")
-        escaped = escaped.replace(")", "\\)")
-        _shell("input", "text", escaped)
-        return [{"type": "text", "text": f"Typed: {text}"}]
+        escaped = text.translate(_TYPE_TRANS)
+        return [{"type": "text", "text": f"Typed: {text}"}] + _act(
+            "input", "text", escaped, verify=verify
+        )
 
     elif name == "swipe":
         direction = args["direction"]
@@ -275,25 +758,30 @@ def exec_tool(name: str, args: dict) -> list:
             ex, ey = cx + dist, cy
         else:
             return [{"type": "text", "text": f"Invalid direction: {direction}"}]
-        _shell("input", "swipe", str(cx), str(cy), str(ex), str(ey), "300")
-        return [{"type": "text", "text": f"Swiped {direction}"}]
+        return [{"type": "text", "text": f"Swiped {direction}"}] + _act(
+            "input", "swipe", str(cx), str(cy), str(ex), str(ey), "300", verify=verify
+        )
 
     elif name == "press_key":
         key = args["key"]
         keymap = {"enter": "66", "backspace": "67", "back": "4", "home": "3"}
         keycode = keymap.get(key, key)
-        _shell("input", "keyevent", keycode)
-        return [{"type": "text", "text": f"Pressed {key}"}]
+        return [{"type": "text", "text": f"Pressed {key}"}] + _act(
+            "input", "keyevent", keycode, verify=verify
+        )
 
     elif name == "launch_app":
         package = args["package"]
-        _shell("monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1")
-        return [{"type": "text", "text": f"Launched {package}"}]
+        return [{"type": "text", "text": f"Launched {package}"}] + _act(
+            "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1",
+            verify=verify,
+        )
 
     elif name == "long_press":
-        x, y = int(args["x"]), int(args["y"])
-        _shell("input", "swipe", str(x), str(y), str(x), str(y), "1000")
-        return [{"type": "text", "text": f"Long-pressed ({x}, {y})"}]
+        x, y = _to_device(args["x"], args["y"])
+        return [{"type": "text", "text": f"Long-pressed ({args['x']}, {args['y']})"}] + _act(
+            "input", "swipe", str(x), str(y), str(x), str(y), "1000", verify=verify
+        )
 
     elif name == "done":
         return [{"type": "text", "text": args["summary"]}]
@@ -309,12 +797,12 @@ SYSTEM = """\
 You are an Android phone operator. You can see the screen via screenshots and \
 interact using tap, type_text, swipe, press_key, launch_app, and long_press.
 
-Screen coordinates are in pixels. The screen is {w}x{h}.
+Coordinates are in screenshot pixels; each screenshot states its size.
 
 Strategy:
 1. Always start by taking a screenshot to see the current state.
-2. Decide on one action at a time.
-3. After each action, take another screenshot to verify the result.
+2. When the next few steps are clear (e.g. tap a field, type, press enter), issue them together in one turn — they run in order.
+3. A fresh screenshot is attached automatically after actions that change the screen, so you don't need to request one to verify the result.
 4. When the task is complete, call the `done` tool with a summary.
 
 Be precise with coordinates — look carefully at the screenshot to identify \
@@ -322,10 +810,57 @@ where UI elements are before tapping.\
 """
 
 
-def run(task: str, max_steps: int = 25, model: str = "claude-sonnet-4-5-20250929"):
-    global SCREEN_W, SCREEN_H
-
-    client = anthropic.Anthropic()
+def _consume_stream(stream):
+    """Print Claude's text as it streams in and warm up screenshots it asks for.
+
+    When a `screenshot` tool_use starts before any other action in the turn,
+    the capture is kicked off immediately so it runs while the rest of the
+    response is still being generated.
+    """
+    pending = ""
+    acted = False
+    for event in stream:
+        if event.type == "text":
+            pending += event.text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                log_thinking(line)
+        elif event.type == "content_block_start":
+            if pending:
+                log_thinking(pending)
+                pending = ""
+            block = event.content_block
+            if block.type != "tool_use":
+                continue
+            if block.name != "screenshot":
+                acted = True
+            elif not acted:
+                _start_prefetch()
+    if pending:
+        log_thinking(pending)
+
+
+def run(
+    task: str,
+    max_steps: int = 25,
+    model: str = "claude-sonnet-4-5-20250929",
+    files_api: bool = False,
+):
+    global SCREEN_W, SCREEN_H, _device_serial
+
+    # Tool execution between turns can outlast httpx's 5s keep-alive default;
+    # keep the one API connection warm so later turns skip the TLS handshake.
+    client = anthropic.Anthropic(
+        http_client=anthropic.DefaultHttpxClient(
+            http2=HTTP2,
+            limits=httpx.Limits(max_keepalive_connections=1, keepalive_expiry=60.0),
+        )
+    )
+    if files_api:
+        _uploads["client"] = client
+        messages_api, extra = client.beta.messages, {"betas": [FILES_API_BETA]}
+    else:
+        messages_api, extra = client.messages, {}
 
     # Check ADB connectivity
     print(f"  {C.DIM}Checking ADB connection...{C.RESET}")
@@ -336,66 +871,101 @@ def run(task: str, max_steps: int = 25, model: str = "claude-sonnet-4-5-20250929
         print(f"  {C.RED}{C.BOLD}Error:{C.RESET} {C.RED}No ADB devices found.{C.RESET}")
         print(f"  Connect a device with USB debugging enabled and run 'adb devices'.")
         sys.exit(1)
+    if not _device_serial:
+        _device_serial = device_lines[0].split()[0]
 
     # Get screen size
     try:
-        wm_output = _shell("wm", "size")
-        for line in wm_output.splitlines():
-            if "Physical size" in line:
-                dims = line.split(":")[-1].strip()
-                w, h = dims.split("x")
-                SCREEN_W, SCREEN_H = int(w), int(h)
-                break
-        if SCREEN_W == 0:
+        m = _SIZE_RE.search(_shell("wm", "size"))
+        if m:
+            SCREEN_W, SCREEN_H = int(m[1]), int(m[2])
+        else:
             SCREEN_W, SCREEN_H = 1080, 2400
     except Exception:
         SCREEN_W, SCREEN_H = 1080, 2400
 
-    print(f"  {C.GREEN}Connected{C.RESET} | Screen: {SCREEN_W}x{SCREEN_H}")
+    print(
+        f"  {C.GREEN}Connected{C.RESET} | Screen: {SCREEN_W}x{SCREEN_H}"
+    )
     print(f"  {C.DIM}Model: {model}{C.RESET}")
     print(f"  {C.MAGENTA}{C.BOLD}Task:{C.RESET} {task}")
 
-    system_prompt = SYSTEM.format(w=SCREEN_W, h=SCREEN_H)
-    messages = [{"role": "user", "content": f"Task: {task}"}]
+    # Tools, system prompt and the task are byte-identical every turn, so mark
+    # them cacheable; later turns read them from the prompt cache.
+    system_prompt = [
+        {
+            "type": "text",
+            "text": SYSTEM,
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": f"Task: {task}",
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        }
+    ]
     total_tokens = 0
+    total_cached = 0
     start_time = time.time()
 
     for step in range(1, max_steps + 1):
         log_step(step, max_steps)
 
         t0 = time.time()
-        response = client.messages.create(
+        with messages_api.stream(
             model=model,
             max_tokens=1024,
             system=system_prompt,
             tools=TOOLS,
             messages=messages,
-        )
+            **extra,
+        ) as stream:
+            _consume_stream(stream)
+            response = stream.get_final_message()
         api_ms = int((time.time() - t0) * 1000)
         total_tokens += response.usage.input_tokens + response.usage.output_tokens
+        cached = getattr(response.usage, "cache_read_input_tokens", None) or 0
+        total_cached += cached
 
         print(
             f"  {C.DIM}API: {api_ms}ms | tokens: "
-            f"+{response.usage.input_tokens + response.usage.output_tokens}{C.RESET}"
+            f"+{response.usage.input_tokens + response.usage.output_tokens}"
+            f" | cache read: {cached}{C.RESET}"
         )
 
         # Process response
         assistant_content = response.content
         messages.append({"role": "assistant", "content": assistant_content})
 
-        # Show Claude's thinking
-        for block in assistant_content:
-            if block.type == "text" and block.text:
-                log_thinking(block.text)
-
         # Check stop
         if response.stop_reason == "end_turn":
             print(f"\n  {C.DIM}Claude finished (no more tool calls).{C.RESET}")
             break
 
-        # Execute tool calls
+        # Execute tool calls (Claude may batch several per turn)
         tool_results = []
         finished = False
+        # The last screen-changing action not followed by a screenshot gets one
+        # attached, so Claude doesn't need a round-trip to verify it.
+        verify_id = None
+        for block in assistant_content:
+            if block.type != "tool_use":
+                continue
+            if block.name in MUTATING_TOOLS:
+                verify_id = block.id
+            elif block.name == "screenshot":
+                verify_id = None
+            elif block.name == "done":
+                verify_id = None
+                break
+
         for block in assistant_content:
             if block.type != "tool_use":
                 continue
@@ -405,7 +975,7 @@ def run(task: str, max_steps: int = 25, model: str = "claude-sonnet-4-5-20250929
             log_action(name, args)
 
             t0 = time.time()
-            result_content = exec_tool(name, args)
+            result_content = exec_tool(name, args, verify=block.id == verify_id)
             exec_ms = int((time.time() - t0) * 1000)
             log_result(name, exec_ms)
 
@@ -430,7 +1000,11 @@ def run(task: str, max_steps: int = 25, model: str = "claude-sonnet-4-5-20250929
         print(f"\n  {C.YELLOW}Reached max steps ({max_steps}).{C.RESET}")
 
     elapsed = time.time() - start_time
-    print(f"\n{C.DIM}  {elapsed:.1f}s total | {total_tokens:,} tokens{C.RESET}")
+    print(
+        f"\n{C.DIM}  {elapsed:.1f}s total | {total_tokens:,} tokens "
+        f"(+{total_cached:,} from cache) | "
+        f"{_shot_stats['hits']}/{_shot_stats['total']} screenshots from cache{C.RESET}"
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -450,10 +1024,18 @@ def main():
         default="claude-sonnet-4-5-20250929",
         help="Anthropic model (default: claude-sonnet-4-5-20250929)",
     )
+    parser.add_argument(
+        "--files-api",
+        action="store_true",
+        help="Upload screenshots via the Files API (beta) instead of inlining them",
+    )
     args = parser.parse_args()
 
     print(BANNER)
-    run(args.task, max_steps=args.steps, model=args.model)
+    try:
+        run(args.task, max_steps=args.steps, model=args.model, files_api=args.files_api)
+    finally:
+        _delete_uploads()
 
 
 if __name__ == "__main__":
@@ -1,25 +1,57 @@
 """
 AGI Android MCP Server — control any Android device via ADB.
 
-All device interaction goes through `adb` subprocess calls.
+All device interaction goes through `adb`. Shell commands are fed to one
+long-lived `adb shell` process; binary transfers use one-shot `adb exec-out`.
 No proprietary dependencies, works with any Android phone that has USB debugging enabled.
+
+When the target is an Android emulator and `grpcio` is installed, screenshots are
+pulled over the emulator's gRPC control channel instead of `adb screencap`.
 """
 
 import base64
 import os
+import re
+import select
+import shlex
 import shutil
+import struct
 import subprocess
+import threading
 import time
+import uuid
+import zlib
+from typing import Final
 
 from mcp.server.fastmcp import FastMCP, Image
 
+try:
+    import grpc
+except ImportError:  # optional: pip install agi-android-mcp[emulator]
+    grpc = None
+
 # ---------------------------------------------------------------------------
 # ADB helpers
 # ---------------------------------------------------------------------------
 
 ADB = os.environ.get("ADB_PATH", shutil.which("adb") or "adb")
+if shutil.which(ADB):
+    # Resolve to an absolute path once; subprocess only uses posix_spawn for those.
+    ADB = os.path.abspath(shutil.which(ADB))
 SERIAL = os.environ.get("ADB_SERIAL", "")
 
+# Children only get the variables adb cares about instead of a full copy of
+# our environment (POSIX only — Windows processes need much more).
+_ADB_ENV = (
+    {
+        k: v
+        for k, v in os.environ.items()
+        if k in ("PATH", "HOME", "TMPDIR") or k.startswith(("ADB_", "ANDROID_"))
+    }
+    if os.name == "posix"
+    else None
+)
+
 
 def _adb(*args: str, timeout: float = 10.0) -> subprocess.CompletedProcess:
     """Run an adb command and return the CompletedProcess."""
@@ -27,17 +59,174 @@ def _adb(*args: str, timeout: float = 10.0) -> subprocess.CompletedProcess:
     if SERIAL:
         cmd += ["-s", SERIAL]
     cmd += list(args)
-    return subprocess.run(cmd, capture_output=True, timeout=timeout)
+    # close_fds=False is safe (Python fds are non-inheritable by default) and,
+    # with an absolute ADB path, lets subprocess use posix_spawn over fork+exec.
+    return subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=-1,
+        close_fds=False,
+        env=_ADB_ENV,
+        timeout=timeout,
+    )
+
+
+class _AdbShell:
+    """A single long-lived `adb shell` process that commands are piped into.
+
+    Spawning `adb` and reopening the transport for every tap or keyevent costs
+    more than the command itself. Commands are written to the shell's stdin
+    and their output is read back up to a unique end-of-command sentinel that
+    also carries the exit status. A lock serializes concurrent tool calls.
+    """
+
+    def __init__(self):
+        self.p: subprocess.Popen | None = None
+        self.lock = threading.Lock()
+        self.token = uuid.uuid4().hex
+        self.begin = f"__BEGIN_{self.token}__".encode()
+        self.sentinel = f"__END_{self.token}__".encode()
+
+    def _start(self) -> None:
+        cmd = [ADB]
+        if SERIAL:
+            cmd += ["-s", SERIAL]
+        cmd.append("shell")
+        self.p = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=-1,
+            close_fds=False,
+            env=_ADB_ENV,
+        )
+
+    def close(self) -> None:
+        if self.p is not None:
+            self.p.kill()
+            self.p.wait()
+            self.p = None
+
+    def _send(self, line: bytes) -> None:
+        if self.p is None or self.p.poll() is not None:
+            self.close()
+            self._start()
+        try:
+            self.p.stdin.write(line)
+            self.p.stdin.flush()
+        except (BrokenPipeError, OSError):
+            # adb died (device unplugged, server restarted) — reconnect once.
+            self.close()
+            self._start()
+            try:
+                self.p.stdin.write(line)
+                self.p.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.close()
+                raise RuntimeError(f"adb shell is not accepting commands: {e}") from e
+
+    def run(self, command: str, timeout: float = 10.0) -> tuple[int, bytes]:
+        """Run `command` on the device and return (exit status, stdout).
+
+        The command is executed by a child `sh -c` so it is parsed exactly as
+        `adb shell <command>` would parse it, cannot consume our stdin, and
+        cannot take the persistent shell down with `exit` or a syntax error.
+        """
+        if os.name != "posix":
+            # select() can't wait on pipes on Windows; use one-shot adb there.
+            r = _adb("shell", command, timeout=timeout)
+            return r.returncode, r.stdout
+        # The markers are printed as two halves, so a PTY echoing this line back
+        # (devices without shell_v2) can never be mistaken for them.
+        line = (
+            f"printf '%s%s\\n' __BEGIN_ {self.token}__; "
+            f"sh -c {shlex.quote(command)} </dev/null; "
+            f"printf '\\n%s%s%d\\n' __END_ {self.token}__ $?\n"
+        ).encode()
+        with self.lock:
+            self._send(line)
+            fd = self.p.stdout.fileno()
+            buf = bytearray()
+            deadline = time.monotonic() + timeout
+            while True:
+                end = buf.find(self.sentinel)
+                if end != -1 and buf.find(b"\n", end) != -1:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    # Output state is unknown now; start fresh next time.
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    self.close()
+                    raise RuntimeError(f"adb shell exited while running: {command}")
+                buf += chunk
+            status_end = buf.index(b"\n", end)
+            try:
+                code = int(buf[end + len(self.sentinel):status_end].rstrip(b"\r"))
+            except ValueError:
+                self.close()
+                raise RuntimeError(f"adb shell returned no exit status for: {command}")
+            # Output sits between the begin marker's line and the newline printed
+            # ahead of the end marker (\r\n on a PTY).
+            start = buf.find(self.begin)
+            start = buf.index(b"\n", start) + 1 if start != -1 else 0
+            out = bytes(buf[start:end]).removesuffix(b"\n").removesuffix(b"\r")
+            return code, out
+
+
+_adb_shell = _AdbShell()
+
+
+# Connection state and screen size barely change within a session, so they are
+# re-probed only after a TTL or after a shell command fails.
+CONNECTION_TTL = 30.0
+SCREEN_SIZE_TTL = 300.0
+_conn_cache: dict = {"serial": None, "ts": 0.0}
+_size_cache: dict = {"size": None, "ts": 0.0}
+
+
+def _invalidate_caches() -> None:
+    """Force the next tool call to re-check the device."""
+    _conn_cache["serial"] = None
+    _size_cache["size"] = None
+
+
+def _shell_raw(*args: str, timeout: float = 10.0) -> bytes:
+    """Run `adb shell <args>` and return stdout as undecoded bytes."""
+    try:
+        _, out = _adb_shell.run(" ".join(args), timeout=timeout)
+    except (subprocess.TimeoutExpired, RuntimeError):
+        _invalidate_caches()
+        raise
+    return out
 
 
 def _shell(*args: str, timeout: float = 10.0) -> str:
     """Run `adb shell <args>` and return stdout as a stripped string."""
-    r = _adb("shell", *args, timeout=timeout)
-    return r.stdout.decode("utf-8", errors="replace").strip()
+    return _shell_raw(*args, timeout=timeout).decode("utf-8", errors="replace").strip()
 
 
 def _check_connection() -> str:
-    """Verify an ADB device is connected and reachable."""
+    """Verify an ADB device is connected and reachable.
+
+    A successful probe is reused for CONNECTION_TTL seconds.
+    """
+    if (
+        _conn_cache["serial"] is not None
+        and time.monotonic() - _conn_cache["ts"] < CONNECTION_TTL
+    ):
+        return _conn_cache["serial"]
+    serial = _probe_connection()
+    _conn_cache["serial"], _conn_cache["ts"] = serial, time.monotonic()
+    return serial
+
+
+def _probe_connection() -> str:
+    """Run `adb devices` and return the serial of the usable device."""
     r = _adb("devices", timeout=5.0)
     output = r.stdout.decode("utf-8", errors="replace")
     lines = [l for l in output.strip().splitlines()[1:] if l.strip()]
@@ -67,6 +256,221 @@ def _check_connection() -> str:
     raise RuntimeError(f"No usable ADB device found. Output:\n{output}")
 
 
+_SIZE_RE = re.compile(r"Physical size:\s*(\d+)x(\d+)")
+_ANY_SIZE_RE = re.compile(r"(\d+)\s*x\s*(\d+)")
+
+# `input text` goes through the device shell: spaces become %s and shell
+# metacharacters are backslash-escaped, in a single translate() pass.
+_TYPE_TRANS = str.maketrans({
+    "\\": "\\\\",
+    " ": "%s",
+    "'": "\\'",
+    '"': '\\"',
+    "&": "\\&",
+    "|": "\\|",
+    ";": "\\;",
+    "(": "\\(",
+    ")": "\\)",
+    "<": "\\<",
+    ">": "\\>",
+    "`": "\\`",
+})
+
+
+# ---------------------------------------------------------------------------
+# Emulator gRPC helpers
+# ---------------------------------------------------------------------------
+
+# Explicit override; otherwise the port is derived from the emulator serial
+# (emulator-5554 -> 8554, emulator-5556 -> 8556, ...).
+GRPC_PORT = os.environ.get("ANDROID_GRPC_PORT", "")
+
+# android.emulation.control.EmulatorController/getScreenshot takes an
+# ImageFormat and returns an Image. An empty ImageFormat message means PNG, and
+# the only field we need back is `bytes image = 4`, so the messages are encoded
+# by hand rather than shipping protoc-generated stubs.
+_GET_SCREENSHOT = "/android.emulation.control.EmulatorController/getScreenshot"
+# port -> getScreenshot callable, or None once that port failed the handshake
+_grpc_state: dict = {}
+
+
+def _read_varint(buf: bytes, pos: int) -> tuple[int, int]:
+    """Decode a protobuf varint starting at `pos`; return (value, new_pos)."""
+    value = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _image_bytes(msg: bytes) -> bytes:
+    """Extract the `image` field (4) from a serialized emulator Image message."""
+    pos = 0
+    while pos < len(msg):
+        key, pos = _read_varint(msg, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            _, pos = _read_varint(msg, pos)
+        elif wire == 1:
+            pos += 8
+        elif wire == 5:
+            pos += 4
+        elif wire == 2:
+            size, pos = _read_varint(msg, pos)
+            if field == 4:
+                return msg[pos:pos + size]
+            pos += size
+        else:
+            raise ValueError(f"unsupported protobuf wire type {wire}")
+    return b""
+
+
+def _grpc_port(serial: str) -> int | None:
+    """gRPC port of the emulator behind `serial`, or None for other devices."""
+    if not serial.startswith("emulator-"):
+        return None
+    if GRPC_PORT:
+        return int(GRPC_PORT)
+    try:
+        console_port = int(serial.split("-")[1])
+    except (IndexError, ValueError):
+        return None
+    return 8554 + (console_port - 5554)
+
+
+def _grpc_stub(port: int):
+    """Return a callable for EmulatorController.getScreenshot on `port`, or None.
+
+    Each port's channel is opened once and reused. If grpcio is missing or the
+    emulator does not answer the handshake, gRPC is disabled for that port for
+    the rest of the session and callers fall back to adb.
+    """
+    if grpc is None:
+        return None
+    if port in _grpc_state:
+        return _grpc_state[port]
+    channel = grpc.insecure_channel(
+        f"localhost:{port}",
+        options=[("grpc.max_receive_message_length", 32 * 1024 * 1024)],
+    )
+    try:
+        grpc.channel_ready_future(channel).result(timeout=1.0)
+    except grpc.FutureTimeoutError:
+        channel.close()
+        _grpc_state[port] = None
+        return None
+    _grpc_state[port] = channel.unary_unary(
+        _GET_SCREENSHOT,
+        request_serializer=None,
+        response_deserializer=_image_bytes,
+    )
+    return _grpc_state[port]
+
+
+def _grpc_screenshot(serial: str) -> bytes | None:
+    """Fetch a PNG over the emulator gRPC channel; None means use adb instead."""
+    port = _grpc_port(serial)
+    if port is None:
+        return None
+    stub = _grpc_stub(port)
+    if stub is None:
+        return None
+    try:
+        png_bytes = stub(b"", timeout=5.0)
+    except grpc.RpcError as e:
+        # An emulator that wants a token, or doesn't serve this RPC, will keep
+        # refusing; stop paying the round trip on every screenshot.
+        if e.code() in (grpc.StatusCode.UNAUTHENTICATED, grpc.StatusCode.UNIMPLEMENTED):
+            _grpc_state[port] = None
+        return None
+    return png_bytes or None
+
+
+# ---------------------------------------------------------------------------
+# Screenshot helpers
+# ---------------------------------------------------------------------------
+
+# `screencap` without -p dumps the raw framebuffer: a little-endian header of
+# width, height, pixel format (plus a dataspace word on Android 9+) followed by
+# the pixels. PNG-compressing on the phone is the slowest part of `screencap -p`,
+# so frames are pulled raw and compressed here at a fast zlib level instead.
+# Maps pixel format -> (bytes per pixel, PNG color type).
+_RAW_FORMATS = {
+    1: (4, 6),  # RGBA_8888
+    3: (3, 2),  # RGB_888
+}
+PNG_COMPRESS_LEVEL = 1
+# Pause between an action and its screenshot so transitions can settle.
+SETTLE_SECONDS = 0.5
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data))
+    )
+
+
+def _encode_png(width: int, height: int, pixels, bpp: int, color_type: int) -> bytes:
+    """Encode 8-bit RGB/RGBA pixel rows as a PNG using only zlib."""
+    stride = width * bpp
+    view = memoryview(pixels)
+    rows = (view[i:i + stride] for i in range(0, height * stride, stride))
+    # Every scanline is prefixed with filter type 0 (None).
+    raw = b"\x00" + b"\x00".join(rows)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(raw, PNG_COMPRESS_LEVEL))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def _raw_to_png(buf: bytes) -> bytes | None:
+    """Convert raw `screencap` output to PNG, or None if the format is unsupported."""
+    if len(buf) < 12:
+        return None
+    width, height, fmt = struct.unpack_from("<III", buf)
+    if fmt not in _RAW_FORMATS:
+        return None
+    bpp, color_type = _RAW_FORMATS[fmt]
+    header = len(buf) - width * height * bpp
+    if header not in (12, 16):
+        return None
+    return _encode_png(width, height, memoryview(buf)[header:], bpp, color_type)
+
+
+def _capture_png(before: str = "") -> bytes:
+    """Grab the screen via adb as PNG, preferring the raw framebuffer path.
+
+    `before` is a shell command run on the device ahead of the capture in the
+    same `adb exec-out` call, so an action and its screenshot cost one round-trip.
+    """
+    command = "screencap"
+    if before:
+        command = f"{before} >/dev/null 2>&1; sleep {SETTLE_SECONDS}; screencap"
+    r = _adb("exec-out", command, timeout=15.0 + SETTLE_SECONDS)
+    if r.returncode == 0:
+        png_bytes = _raw_to_png(r.stdout)
+        if png_bytes:
+            return png_bytes
+    # Unknown pixel format or old device: let the phone encode the PNG.
+    r = _adb("exec-out", "screencap", "-p", timeout=15.0)
+    if r.returncode != 0:
+        _invalidate_caches()
+        raise RuntimeError(
+            f"screencap failed: {r.stderr.decode('utf-8', errors='replace')}"
+        )
+    if not r.stdout or len(r.stdout) < 8:
+        raise RuntimeError("screencap returned empty data")
+    return r.stdout
+
+
 # ---------------------------------------------------------------------------
 # MCP Server
 # ---------------------------------------------------------------------------
@@ -85,36 +489,42 @@ mcp = FastMCP(
 @mcp.tool()
 def screenshot() -> Image:
     """Take a screenshot of the Android screen. Returns the current screen as a PNG image."""
-    _check_connection()
-    r = _adb("exec-out", "screencap", "-p", timeout=15.0)
-    if r.returncode != 0:
-        raise RuntimeError(
-            f"screencap failed: {r.stderr.decode('utf-8', errors='replace')}"
-        )
-    png_bytes = r.stdout
-    if not png_bytes or len(png_bytes) < 8:
-        raise RuntimeError("screencap returned empty data")
-    return Image(data=png_bytes, format="png")
+    serial = _check_connection()
+    png_bytes = _grpc_screenshot(serial)
+    if png_bytes:
+        return Image(data=png_bytes, format="png")
+    return Image(data=_capture_png(), format="png")
 
 
 @mcp.tool()
 def get_screen_size() -> dict:
     """Get the physical screen size of the Android device in pixels."""
     _check_connection()
-    output = _shell("wm", "size")
-    # Example: "Physical size: 1080x2400"
-    for line in output.splitlines():
-        if "Physical size" in line:
-            dims = line.split(":")[-1].strip()
-            w, h = dims.split("x")
-            return {"width": int(w), "height": int(h)}
-    # Fallback: try parsing override or whatever is there
-    if "x" in output:
-        parts = output.strip().splitlines()[-1]
-        dims = parts.split(":")[-1].strip() if ":" in parts else parts.strip()
-        if "x" in dims:
-            w, h = dims.split("x")
-            return {"width": int(w.strip()), "height": int(h.strip())}
+    if (
+        _size_cache["size"] is not None
+        and time.monotonic() - _size_cache["ts"] < SCREEN_SIZE_TTL
+    ):
+        return dict(_size_cache["size"])
+    size = _probe_screen_size()
+    _size_cache["size"], _size_cache["ts"] = size, time.monotonic()
+    return dict(size)
+
+
+def _probe_screen_size() -> dict:
+    """Run `wm size` and parse the physical resolution."""
+    return _parse_screen_size(_shell("wm", "size"))
+
+
+def _parse_screen_size(output: str) -> dict:
+    """Parse `wm size` output, e.g. "Physical size: 1080x2400"."""
+    m = _SIZE_RE.search(output)
+    if m is not None:
+        return {"width": int(m[1]), "height": int(m[2])}
+    # Fallback: take the last WxH on offer (e.g. an override size)
+    found = _ANY_SIZE_RE.findall(output)
+    if found:
+        w, h = found[-1]
+        return {"width": int(w), "height": int(h)}
     raise RuntimeError(f"Could not parse screen size from: {output}")
 
 
@@ -126,13 +536,24 @@ def tap(x: int, y: int) -> str:
     return f"Tapped ({x}, {y})"
 
 
+@mcp.tool()
+def tap_and_shoot(x: int, y: int) -> Image:
+    """Tap at (x, y), then take a screenshot once the UI settles.
+
+    Prefer this over tap followed by screenshot when verifying the result:
+    both happen in a single ADB round-trip.
+    """
+    _check_connection()
+    return Image(data=_capture_png(f"input tap {x} {y}"), format="png")
+
+
 @mcp.tool()
 def double_tap(x: int, y: int) -> str:
     """Double-tap at (x, y) pixel coordinates on the screen."""
     _check_connection()
-    _shell("input", "tap", str(x), str(y))
-    time.sleep(0.1)
-    _shell("input", "tap", str(x), str(y))
+    # Both taps in one device-side command; starting the second `input`
+    # process already spaces them enough, so no host-side sleep is needed.
+    _shell(f"input tap {x} {y}; input tap {x} {y}")
     return f"Double-tapped ({x}, {y})"
 
 
@@ -144,6 +565,18 @@ def long_press(x: int, y: int) -> str:
     return f"Long-pressed ({x}, {y})"
 
 
+@mcp.tool()
+def long_press_and_shoot(x: int, y: int) -> Image:
+    """Long-press at (x, y), then take a screenshot once the UI settles.
+
+    Both happen in a single ADB round-trip.
+    """
+    _check_connection()
+    return Image(
+        data=_capture_png(f"input swipe {x} {y} {x} {y} 1000"), format="png"
+    )
+
+
 @mcp.tool()
 def type_text(text: str) -> str:
     """Type text into the currently focused input field.
@@ -151,24 +584,44 @@ def type_text(text: str) -> str:
     Handles spaces and special characters automatically.
     """
     _check_connection()
-    # ADB input text doesn't handle spaces well — replace with %s
-    # Also escape shell-special characters
-    escaped = text.replace("\\", "\\\\")
-    escaped = escaped.replace(" ", "%s")
-    escaped = escaped.replace("'", "\\'")
-    escaped = escaped.replace('"', '\\"')
-    escaped = escaped.replace("&", "\\&")
-    escaped = escaped.replace("|", "\\|")
-    escaped = escaped.replace(";", "\\;")
-    escaped = escaped.replace("(", "\\(")
-    escaped = escaped.replace(")", "\\)")
-    escaped = escaped.replace("<", "\\<")
-    escaped = escaped.replace(">", "\\>")
-    escaped = escaped.replace("`", "\\`")
+    escaped = text.translate(_TYPE_TRANS)
     _shell("input", "text", escaped)
     return f"Typed: {text}"
 
 
+@mcp.tool()
+def type_text_and_shoot(text: str) -> Image:
+    """Type text into the focused field, then take a screenshot.
+
+    Both happen in a single ADB round-trip.
+    """
+    _check_connection()
+    return Image(
+        data=_capture_png(f"input text {text.translate(_TYPE_TRANS)}"), format="png"
+    )
+
+
+_KEYMAP: Final[dict[str, str]] = {
+    "enter": "66",
+    "backspace": "67",
+    "delete": "112",
+    "tab": "61",
+    "space": "62",
+    "home": "3",
+    "back": "4",
+    "menu": "82",
+    "search": "84",
+    "volume_up": "24",
+    "volume_down": "25",
+    "power": "26",
+    "escape": "111",
+}
+# Prebuilt `input keyevent` argv per key name
+_KEYARGV: Final[dict[str, tuple[str, ...]]] = {
+    name: ("input", "keyevent", code) for name, code in _KEYMAP.items()
+}
+
+
 @mcp.tool()
 def press_key(key: str) -> str:
     """Press a key on the Android device.
@@ -177,27 +630,12 @@ def press_key(key: str) -> str:
     menu, search, volume_up, volume_down, power, escape.
     """
     _check_connection()
-    keymap = {
-        "enter": "66",
-        "backspace": "67",
-        "delete": "112",
-        "tab": "61",
-        "space": "62",
-        "home": "3",
-        "back": "4",
-        "menu": "82",
-        "search": "84",
-        "volume_up": "24",
-        "volume_down": "25",
-        "power": "26",
-        "escape": "111",
-    }
-    keycode = keymap.get(key.lower())
-    if keycode is None:
+    argv = _KEYARGV.get(key.lower())
+    if argv is None:
         # Try as raw KEYCODE_ value
         _shell("input", "keyevent", key)
         return f"Pressed key: {key}"
-    _shell("input", "keyevent", keycode)
+    _shell(*argv)
     return f"Pressed {key}"
 
 
@@ -212,6 +650,30 @@ def swipe(direction: str, distance: int = 500, x: int = -1, y: int = -1) -> str:
         y: Starting Y coordinate. Defaults to screen center.
     """
     _check_connection()
+    x, y, ex, ey = _swipe_coords(direction, distance, x, y)
+    _shell("input", "swipe", str(x), str(y), str(ex), str(ey), "300")
+    return f"Swiped {direction.lower()} from ({x}, {y}) to ({ex}, {ey})"
+
+
+@mcp.tool()
+def swipe_and_shoot(
+    direction: str, distance: int = 500, x: int = -1, y: int = -1
+) -> Image:
+    """Swipe like `swipe`, then take a screenshot once the UI settles.
+
+    Both happen in a single ADB round-trip.
+    """
+    _check_connection()
+    x, y, ex, ey = _swipe_coords(direction, distance, x, y)
+    return Image(
+        data=_capture_png(f"input swipe {x} {y} {ex} {ey} 300"), format="png"
+    )
+
+
+def _swipe_coords(
+    direction: str, distance: int, x: int, y: int
+) -> tuple[int, int, int, int]:
+    """Resolve a swipe's start (defaulting to screen center) and end points."""
     # Get screen size for centering
     if x < 0 or y < 0:
         size = get_screen_size()
@@ -231,9 +693,7 @@ def swipe(direction: str, distance: int = 500, x: int = -1, y: int = -1) -> str:
         ex, ey = x + distance, y
     else:
         raise ValueError(f"Invalid direction: {direction}. Use up/down/left/right.")
-
-    _shell("input", "swipe", str(x), str(y), str(ex), str(ey), "300")
-    return f"Swiped {direction} from ({x}, {y}) to ({ex}, {ey})"
+    return x, y, ex, ey
 
 
 @mcp.tool()
@@ -253,7 +713,7 @@ def drag(start_x: int, start_y: int, end_x: int, end_y: int) -> str:
 def press_home() -> str:
     """Press the Home button."""
     _check_connection()
-    _shell("input", "keyevent", "KEYCODE_HOME")
+    _shell(*_KEYARGV["home"])
     return "Pressed Home"
 
 
@@ -261,7 +721,7 @@ def press_home() -> str:
 def press_back() -> str:
     """Press the Back button."""
     _check_connection()
-    _shell("input", "keyevent", "KEYCODE_BACK")
+    _shell(*_KEYARGV["back"])
     return "Pressed Back"
 
 
@@ -297,27 +757,35 @@ def launch_app(package: str) -> str:
     return f"Launched {package}"
 
 
+# package/activity component, e.g. "com.android.chrome/.Main"
+_COMPONENT_RE = re.compile(rb"([\w.]+/[\w.$]+)")
+
+
 @mcp.tool()
 def get_current_app() -> str:
     """Get the currently visible app (package name and activity)."""
     _check_connection()
-    output = _shell("dumpsys", "activity", "activities", timeout=5.0)
-    for line in output.splitlines():
-        if "mResumedActivity" in line or "ResumedActivity" in line:
-            return line.strip()
-    return "Could not determine current activity"
+    # Filter on the device so only the two focus lines cross the wire,
+    # instead of the whole activity stack from `dumpsys activity activities`.
+    raw = _shell_raw(
+        "dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'", timeout=5.0
+    )
+    m = _COMPONENT_RE.search(raw)
+    if m is None:
+        return "Could not determine current activity"
+    return m[1].decode("utf-8", errors="replace")
 
 
 @mcp.tool()
 def list_installed_apps() -> list[str]:
     """List third-party installed apps (package names)."""
     _check_connection()
-    output = _shell("pm", "list", "packages", "-3", timeout=10.0)
-    packages = []
-    for line in output.splitlines():
-        line = line.strip()
-        if line.startswith("package:"):
-            packages.append(line[len("package:"):])
+    raw = _shell_raw("pm", "list", "packages", "-3", timeout=10.0)
+    packages = [
+        line[8:].decode("utf-8", errors="replace")
+        for line in raw.splitlines()
+        if line.startswith(b"package:")
+    ]
     return sorted(packages)
 
 
@@ -332,29 +800,34 @@ def shell(command: str) -> str:
     return result
 
 
+_INFO_SEP = "__INFO_SEP__"
+
+
 @mcp.tool()
 def get_device_info() -> dict:
     """Get device information: screen size, Android version, model, and battery level."""
     _check_connection()
 
+    # One shell round-trip for everything, sections split on a marker line
+    sections = _shell(
+        f"wm size; echo {_INFO_SEP}; "
+        f"getprop ro.build.version.release; echo {_INFO_SEP}; "
+        f"getprop ro.product.model; echo {_INFO_SEP}; "
+        f"getprop ro.product.manufacturer; echo {_INFO_SEP}; "
+        "dumpsys battery"
+    ).split(_INFO_SEP)
+    wm_output, android_version, model, manufacturer, battery_output = (
+        part.strip() for part in sections
+    )
+
     # Screen size
-    screen = {}
     try:
-        screen = get_screen_size()
-    except Exception as e:
+        screen = _parse_screen_size(wm_output)
+        _size_cache["size"], _size_cache["ts"] = dict(screen), time.monotonic()
+    except RuntimeError as e:
         screen = {"error": str(e)}
 
-    # Android version
-    android_version = _shell("getprop", "ro.build.version.release")
-
-    # Device model
-    model = _shell("getprop", "ro.product.model")
-
-    # Manufacturer
-    manufacturer = _shell("getprop", "ro.product.manufacturer")
-
     # Battery
-    battery_output = _shell("dumpsys", "battery")
     battery = {}
     for line in battery_output.splitlines():
         line = line.strip()